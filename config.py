@@ -1,10 +1,21 @@
 # config.py
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
+
 class Config:
     def __init__(self):
-        load_dotenv()
         self.STEAM_API_KEY = os.getenv("STEAM_API_KEY")
+        if not self.STEAM_API_KEY:
+            raise RuntimeError(
+                "STEAM_API_KEY não definida. Configure-a no arquivo .env ou no ambiente."
+            )
+
 
-cfg = Config()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_config():
+    """Carrega o .env uma única vez por processo e retorna a configuração"""
+    load_dotenv(override=False)
+    return Config()
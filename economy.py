@@ -1,11 +1,35 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+
 import imfp
+import numpy as np
+import pandas as pd
+import requests_cache
 
 
 class IMFEconomicDataCollector:
     """Coleta indicadores econômicos do IMF e exporta para CSV"""
 
+    # Nomes de colunas que o imfp pode retornar -> nomes padronizados, em ordem
+    # de prioridade: se mais de um alias estiver presente, vale o primeiro
+    _ALIAS_MAP = {
+        "TIME_PERIOD": "year",
+        "@TIME_PERIOD": "year",
+        "time_period": "year",
+        "REF_AREA": "country",
+        "@REF_AREA": "country",
+        "ref_area": "country",
+        "OBS_VALUE": "value",
+        "@OBS_VALUE": "value",
+        "obs_value": "value",
+    }
+
+    # Máximo de chamadas simultâneas ao imfp (ver collect_data)
+    _MAX_WORKERS = 2
+
+    # Colunas do formato longo produzido por collect_data
+    _COLUMNS = ["country", "year", "indicator", "indicator_description", "value"]
+
     def __init__(self):
         self.indicators_info = {
             "PCPIPCH": "taxa de inflação, média de preços consumidores (percentual anual)",
@@ -24,71 +48,91 @@ class IMFEconomicDataCollector:
         - end_year: ano final (por exemplo, 2024)
         """
 
-        all_data = []
-
-        for indicator in indicators:
-            print(f"Coletando {indicator}...")
-
-            try:
-                # Fetch data from IMF World Economic Outlook (WEO) database
-                df = imfp.imf_dataset(
+        # Busca os indicadores em paralelo - cada chamada bloqueia na API do IMF.
+        # O imfp espaça suas próprias requisições (IMF_WAIT_TIME, 1.5s), mas o
+        # controle não é thread-safe: threads simultâneas disparam juntas.
+        # Por isso a concorrência fica limitada a _MAX_WORKERS, trocando um
+        # ganho menor por não furar o limite de taxa do IMF (evita rajadas de 429)
+        with ThreadPoolExecutor(max_workers=min(self._MAX_WORKERS, len(indicators) or 1)) as executor:
+            futures = {}
+            for indicator in indicators:
+                print(f"Coletando {indicator}...")
+                future = executor.submit(
+                    imfp.imf_dataset,
                     database_id="WEO",
                     indicator=indicator,
                     country=countries,
                     start_year=start_year,
                     end_year=end_year,
                 )
+                futures[future] = indicator
+
+            results = {}
+            for future in as_completed(futures):
+                indicator = futures[future]
+
+                try:
+                    df = future.result()
+
+                    if df is not None and not df.empty:
+                        columns = self._extract_columns(df, indicator)
+                        results[indicator] = columns
+                        print(f"  ✓ {indicator}: Collected {len(df)} records")
+                    else:
+                        print(f"  ✗ {indicator}: No data found")
+
+                except Exception as e:
+                    print(f"  ✗ {indicator}: Error: {e}")
+
+        if not results:
+            return pd.DataFrame()
 
-                if df is not None and not df.empty:
-                    # Standardize column names
-                    rename_map = {}
-
-                    # Find year column
-                    for col in ["TIME_PERIOD", "@TIME_PERIOD", "time_period"]:
-                        if col in df.columns:
-                            rename_map[col] = "year"
-                            break
-
-                    # Find country column
-                    for col in ["REF_AREA", "@REF_AREA", "ref_area"]:
-                        if col in df.columns:
-                            rename_map[col] = "country"
-                            break
-
-                    # Find value column
-                    for col in ["OBS_VALUE", "@OBS_VALUE", "obs_value"]:
-                        if col in df.columns:
-                            rename_map[col] = "value"
-                            break
-
-                    df = df.rename(columns=rename_map)
-
-                    # Add indicator column and description
-                    if "indicator" not in df.columns:
-                        df["indicator"] = indicator
-                    
-                    df["indicator_description"] = self.indicators_info.get(
-                        indicator, indicator
-                    )
-
-                    # Keep only relevant columns
-                    cols_to_keep = [
-                        "country", "year", "indicator", 
-                        "indicator_description", "value"
-                    ]
-                    df = df[[col for col in cols_to_keep if col in df.columns]]
-
-                    all_data.append(df)
-                    print(f"  ✓ Collected {len(df)} records")
-                else:
-                    print("  ✗ No data found")
-
-            except Exception as e:
-                print(f"  ✗ Error: {e}")
-
-        if all_data:
-            return pd.concat(all_data, ignore_index=True)
-        return pd.DataFrame()
+        # Acumula as colunas de cada indicador (na ordem solicitada) e monta
+        # o DataFrame final de uma vez, sem frames intermediários
+        buffers = {col: [] for col in self._COLUMNS}
+        for indicator in indicators:
+            if indicator in results:
+                for col, values in results[indicator].items():
+                    buffers[col].append(values)
+
+        df = pd.DataFrame({col: np.concatenate(arrays) for col, arrays in buffers.items()})
+        for col in ("country", "indicator"):
+            df[col] = df[col].astype("category")
+        return df
+
+    def _extract_columns(self, df, indicator):
+        """Extrai as colunas padronizadas de um dataset retornado pelo imfp"""
+
+        # Lê cada campo direto da coluna de origem, sem renomear/copiar o df;
+        # se nenhum alias existir, usa a coluna já com o nome padronizado
+        sources = self._resolve_columns(df)
+
+        def column(field):
+            return df[sources.get(field, field)].to_numpy()
+
+        size = len(df)
+        if "indicator" in df.columns:
+            indicator_values = df["indicator"].to_numpy()
+        else:
+            indicator_values = np.full(size, indicator, dtype=object)
+
+        description = self.indicators_info.get(indicator, indicator)
+
+        return {
+            "country": column("country"),
+            "year": column("year"),
+            "indicator": indicator_values,
+            "indicator_description": np.full(size, description, dtype=object),
+            "value": column("value"),
+        }
+
+    def _resolve_columns(self, df):
+        """Escolhe, para cada campo padronizado, o alias de maior prioridade presente"""
+        sources = {}
+        for alias, field in self._ALIAS_MAP.items():
+            if field not in sources and alias in df.columns:
+                sources[field] = alias
+        return sources
 
     def prepare_csv_formats(self, df):
         """Prepara dados em diferentes formatos CSV"""
@@ -113,6 +157,7 @@ class IMFEconomicDataCollector:
             columns="indicator",
             values="value",
             aggfunc="first",
+            observed=True,
         ).reset_index()
         
         # Renomear colunas com descrições
@@ -135,7 +180,8 @@ class IMFEconomicDataCollector:
         
         for format_name, df in formats.items():
             filename = f"{base_filename}_{format_name}.csv"
-            df.to_csv(filename, index=False, encoding="utf-8")
+            with open(filename, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+                df.to_csv(f, index=False)
             files_created.append(filename)
             print(f"✓ Arquivo criado: {filename} ({len(df)} linhas)")
         
@@ -183,6 +229,16 @@ def main():
     print("Coletor de dados econômicos do IMF - Export CSV")
     print("=" * 70)
 
+    # O imfp faz as requisições via requests; os dados do WEO mudam no máximo
+    # algumas vezes por ano, então as respostas ficam em cache por 1 dia
+    requests_cache.install_cache(
+        "imf_cache",
+        backend="sqlite",
+        expire_after=86400,
+        allowable_codes=(200,),
+        stale_if_error=True,
+    )
+
     collector = IMFEconomicDataCollector()
 
     # Configuration
@@ -210,9 +266,9 @@ def main():
         print("=" * 70)
         print(f"Total de registros: {len(df)}")
         print("\nPor indicador:")
-        print(df.groupby("indicator").size().to_string())
+        print(df.groupby("indicator", observed=True).size().to_string())
         print("\nPor país:")
-        print(df.groupby("country").size().to_string())
+        print(df.groupby("country", observed=True).size().to_string())
 
         # Prepare CSV formats
         print("\n" + "=" * 70)
@@ -0,0 +1,56 @@
+# http_client.py
+import requests
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
+
+# Timeout padrão (conexão, leitura) em segundos: uma conexão TCP travada
+# falha rápido sem consumir todo o tempo reservado para a leitura
+DEFAULT_TIMEOUT = (3.05, 30)
+
+
+def create_session(pool_size=16, cache_name=None, expire_after=None):
+    """Cria uma sessão HTTP com pool de conexões keep-alive e novas tentativas
+
+    Args:
+        pool_size (int): Número máximo de conexões mantidas por host
+        cache_name (str, optional): Nome do cache SQLite em disco; se omitido,
+            as respostas não são armazenadas
+        expire_after (int, optional): Tempo de vida do cache em segundos
+
+    Returns:
+        requests.Session: Sessão pronta para ser reutilizada entre chamadas
+    """
+    retries = Retry(
+        total=5,
+        # Não repete leituras travadas: cada tentativa pode levar o timeout de
+        # leitura inteiro, e a falha deve chegar rápido a quem chamou
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        # Devolve a última resposta em vez de lançar exceção, para que o
+        # tratamento por status_code dos chamadores continue funcionando
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries
+    )
+
+    if cache_name:
+        session = CachedSession(
+            cache_name,
+            backend="sqlite",
+            expire_after=expire_after,
+            allowable_codes=(200,),
+            stale_if_error=True,
+            # Não grava a chave da API no cache nem a usa para casar respostas
+            ignored_parameters=["key"],
+        )
+    else:
+        session = requests.Session()
+    # O requests já envia Accept-Encoding com gzip/deflate e inclui "br" quando
+    # o pacote brotli (em requirements.txt) está instalado
+    session.mount("https://", adapter)
+    return session
@@ -1,12 +1,26 @@
-import json
+import orjson
 import requests
-from config import cfg
+
+from config import get_config
+from http_client import DEFAULT_TIMEOUT, create_session
 
 
 class GameLookup:
     def __init__(self):
-        self.api_key = cfg.STEAM_API_KEY
+        self.api_key = get_config().STEAM_API_KEY
         self.base_url = "https://api.isthereanydeal.com"
+        # Resultados de busca mudam pouco; evita repetir a mesma consulta por 1h
+        self.session = create_session(cache_name="itad_lookup_cache", expire_after=3600)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Fecha a sessão HTTP e libera as conexões do pool"""
+        self.session.close()
 
     def search_game(self, game_name, limit=5):
         """
@@ -27,13 +41,17 @@ class GameLookup:
         }
         
         print(f"🔍 Buscando '{game_name}'...")
-        response = requests.get(url, params=params)
+        try:
+            response = self.session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            print(f"❌ Falha de conexão na busca: {e}")
+            return []
         
         if response.status_code != 200:
             print(f"❌ Erro na busca: {response.status_code}")
             return []
         
-        results = response.json()
+        results = orjson.loads(response.content)
         
         if not results:
             print("❌ Nenhum jogo encontrado")
@@ -42,6 +60,56 @@ class GameLookup:
         print(f"✅ Encontrados {len(results)} jogo(s)")
         return results
 
+    def lookup_game_ids(self, titles):
+        """
+        Busca os IDs de vários jogos pelo título exato em uma única requisição
+
+        Args:
+            titles (list): Lista de títulos exatos dos jogos
+
+        Returns:
+            dict: Mapeia cada título para o ID do jogo (None se não encontrado)
+        """
+        if not titles:
+            return {}
+
+        url = f"{self.base_url}/lookup/id/title/v1"
+        params = {"key": self.api_key}
+
+        print(f"🔍 Buscando IDs de {len(titles)} jogo(s)...")
+        try:
+            response = self.session.post(
+                url,
+                params=params,
+                data=orjson.dumps(list(titles)),
+                headers={"Content-Type": "application/json"},
+                timeout=DEFAULT_TIMEOUT,
+            )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            print(f"❌ Falha de conexão na busca: {e}")
+            return {}
+
+        if response.status_code != 200:
+            print(f"❌ Erro na busca: {response.status_code}")
+            return {}
+
+        ids = orjson.loads(response.content)
+        found = sum(1 for game_id in ids.values() if game_id)
+        print(f"✅ Encontrados {found} de {len(titles)} jogo(s)")
+        return ids
+
+    def lookup_game_id(self, title):
+        """
+        Busca o ID de um jogo pelo título exato
+
+        Args:
+            title (str): Título exato do jogo
+
+        Returns:
+            str: ID do jogo ou None
+        """
+        return self.lookup_game_ids([title]).get(title)
+
     def interactive_search(self, game_name):
         """
         Busca interativa - mostra opções e permite escolher
@@ -70,27 +138,28 @@ class GameLookup:
         print("0. Cancelar")
         print("-" * 60)
         
+        # Mapeia cada opção digitada ao jogo correspondente ("0" cancela)
+        options = {str(i): game for i, game in enumerate(results, 1)}
+        options["0"] = None
+
         while True:
             try:
-                choice = input(f"\nEscolha (0-{len(results)}): ")
-                choice = int(choice)
-                
-                if choice == 0:
-                    print("❌ Cancelado")
-                    return None
-                
-                if 1 <= choice <= len(results):
-                    selected = results[choice - 1]
-                    print(f"✅ Selecionado: {selected['title']}")
-                    return selected
-                else:
-                    print(f"⚠️  Escolha entre 0 e {len(results)}")
-            except ValueError:
-                print("⚠️  Digite um número válido")
+                choice = input(f"\nEscolha (0-{len(results)}): ").strip()
             except KeyboardInterrupt:
                 print("\n❌ Cancelado")
                 return None
 
+            if choice not in options:
+                print(f"⚠️  Escolha um número entre 0 e {len(results)}")
+                continue
+
+            selected = options[choice]
+            if selected is None:
+                print("❌ Cancelado")
+            else:
+                print(f"✅ Selecionado: {selected['title']}")
+            return selected
+
     def save_to_json(self, data, filename="game_lookup.json"):
         """
         Salva resultado da busca em JSON
@@ -103,22 +172,21 @@ class GameLookup:
             print("⚠️  Nenhum dado para salvar")
             return
         
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
         
         print(f"💾 Dados salvos em {filename}")
 
 def main():
-    lookup = GameLookup()
-        
-    # Busca interativa
-    print("=" * 60)
-    print("Busca interativa")
-    print("=" * 60)
-    game_name = input("Digite o nome do jogo para buscar: ")
-    selected = lookup.interactive_search(game_name)
-    if selected:
-        lookup.save_to_json(selected, "selected_game.json")
+    with GameLookup() as lookup:
+        # Busca interativa
+        print("=" * 60)
+        print("Busca interativa")
+        print("=" * 60)
+        game_name = input("Digite o nome do jogo para buscar: ")
+        selected = lookup.interactive_search(game_name)
+        if selected:
+            lookup.save_to_json(selected, "selected_game.json")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
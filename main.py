@@ -1,16 +1,62 @@
-import csv
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+import numpy as np
+import orjson
+import pandas as pd
 import requests
 
-from config import cfg
+from config import get_config
+from http_client import DEFAULT_TIMEOUT, create_session
+
+logger = logging.getLogger(__name__)
+
+# Sessão HTTP compartilhada por todas as chamadas à ITAD (criada sob demanda)
+_SESSION = None
+
+
+def get_session():
+    """Retorna a sessão HTTP compartilhada, criando-a na primeira chamada"""
+    global _SESSION
+    if _SESSION is None:
+        # Mesma janela (jogo, since, until, país) não muda em poucas horas;
+        # reexecuções da análise leem do cache em disco em vez da API
+        _SESSION = create_session(pool_size=10, cache_name="itad_cache", expire_after=3600)
+        _SESSION.headers.update({"User-Agent": "PI-VI/price-analyzer"})
+    return _SESSION
+
+
+def close_session():
+    """Fecha a sessão HTTP compartilhada; a próxima chamada a get_session cria outra"""
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
 
 
 class GamePriceAnalyzer:
-    def __init__(self):
-        self.api_key = cfg.STEAM_API_KEY
+    # Colunas geradas pelo json_normalize -> colunas dos arquivos exportados
+    _EXPORT_COLUMNS = {
+        "timestamp": "timestamp",
+        "shop_id": "shop_id",
+        "shop_name": "shop_name",
+        "deal_price_amount": "price_amount",
+        "deal_price_currency": "price_currency",
+        "deal_regular_amount": "regular_amount",
+        "deal_regular_currency": "regular_currency",
+        "deal_cut": "cut",
+    }
+
+    def __init__(self, session=None):
+        self.api_key = get_config().STEAM_API_KEY
         self.game_id = "018d937f-21e1-728e-86d7-9acb3c59f2bb"
         self.base_url = "https://api.isthereanydeal.com"
+        # A sessão é compartilhada (ou pertence a quem a injetou), então o
+        # analisador não a fecha; o script chama close_session() ao terminar
+        self.session = session or get_session()
 
     def get_price_history(self, start_date=None, end_date=None, shops=None, country=None):
         """Busca o histórico de preços com filtros de intervalo de datas e lojas
@@ -30,6 +76,11 @@ class GamePriceAnalyzer:
         if start_date:
             params["since"] = start_date
 
+        # Envia a data final para a API filtrar no servidor; o filtro local
+        # abaixo continua valendo caso o parâmetro seja ignorado
+        if end_date:
+            params["until"] = end_date
+
         # Adiciona filtro de lojas se fornecido
         if shops:
             params["shops"] = ",".join(map(str, shops))
@@ -38,67 +89,70 @@ class GamePriceAnalyzer:
         if country:
             params["country"] = country
 
-        print("Buscando dados da API...")
-        response = requests.get(url, params=params)
-        print(f"Status: {response.status_code}")
+        logger.debug("Buscando dados da API (país: %s)...", country)
+        try:
+            response = self.session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            # Com as novas tentativas esgotadas, o urllib3 levanta MaxRetryError,
+            # que o requests converte em ConnectionError (e não em Timeout)
+            logger.warning("Falha ao buscar histórico (país: %s): %s", country, e)
+            return []
+        logger.debug("Status: %s", response.status_code)
 
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             if not isinstance(data, list):
-                print("Formato de resposta inesperado")
+                logger.warning("Formato de resposta inesperado (país: %s)", country)
                 return []
 
-            print(f"Total de registros recebidos da API: {len(data)}")
-            
+            logger.debug("Total de registros recebidos da API: %d", len(data))
+
             # Debug: mostra as primeiras lojas encontradas
-            if data and len(data) > 0:
+            if data and logger.isEnabledFor(logging.DEBUG):
                 unique_shops = set()
                 for entry in data[:10]:  # Verifica os primeiros 10
-                    shop_id = entry.get("shop", {}).get("id", "")
-                    shop_name = entry.get("shop", {}).get("name", "")
+                    shop = entry.get("shop") or {}
+                    shop_id = shop.get("id", "")
+                    shop_name = shop.get("name", "")
                     unique_shops.add(f"{shop_id} ({shop_name})")
-                print(f"Exemplos de lojas encontradas: {', '.join(list(unique_shops)[:5])}")
+                logger.debug(
+                    "Exemplos de lojas encontradas: %s", ", ".join(list(unique_shops)[:5])
+                )
+
+            # Aplica filtros de data de forma vetorizada; timestamps ausentes
+            # ou inválidos viram NaT e são descartados pela máscara
+            timestamps = pd.to_datetime(
+                [entry.get("timestamp") or None for entry in data],
+                utc=True,
+                errors="coerce",
+                format="ISO8601",
+            )
+            mask = timestamps.notna()
 
-            # Aplica filtros de data
-            filtered_data = []
-            for entry in data:
-                try:
-                    timestamp = entry.get("timestamp", "")
-                    if not timestamp:
-                        continue
-
-                    entry_date = datetime.fromisoformat(
-                        timestamp.replace("Z", "+00:00")
-                    )
-
-                    # Aplica filtro de data de início
-                    if start_date:
-                        start = datetime.fromisoformat(
-                            start_date.replace("Z", "+00:00")
-                        )
-                        if entry_date < start:
-                            continue
-
-                    # Aplica filtro de data de término
-                    if end_date:
-                        end = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-                        if entry_date > end:
-                            continue
-
-                    filtered_data.append(entry)
-                except (ValueError, AttributeError) as e:
-                    print(f"Erro ao processar entrada: {e}")
-                    continue
-
-            print(f"Encontrados {len(filtered_data)} registros após filtrar")
+            # Aplica filtro de data de início
+            if start_date:
+                mask &= timestamps >= self._to_utc_timestamp(start_date)
+
+            # Aplica filtro de data de término
+            if end_date:
+                mask &= timestamps <= self._to_utc_timestamp(end_date)
+
+            filtered_data = [data[i] for i in np.flatnonzero(mask)]
+
+            logger.debug("Encontrados %d registros após filtrar", len(filtered_data))
             return filtered_data
 
-        print(f"Erro na API: {response.text}")
+        logger.warning(
+            "Erro na API (país: %s, status %s): %s",
+            country,
+            response.status_code,
+            response.text,
+        )
         return []
 
-    def save_price_history_to_csv(self, data, filename="price_history.csv", country=None):
-        """Salva o histórico de preços do jogo em um arquivo CSV"""
-        if not data:
+    def save_price_history_to_csv(self, flat, filename="price_history.csv", country=None):
+        """Salva o histórico de preços já achatado (ver _price_history_frame) em CSV"""
+        if flat.empty:
             print(f"Nenhum dado para salvar em {filename}")
             return
 
@@ -106,40 +160,98 @@ class GamePriceAnalyzer:
         if country:
             filename = f"price_history_{country}.csv"
 
-        processed_data = []
-        for entry in data:
-            price_info = entry.get("deal", {}).get("price", {})
-            regular_info = entry.get("deal", {}).get("regular", {})
-
-            processed_data.append(
-                {
-                    "timestamp": entry.get("timestamp", ""),
-                    "shop_id": entry.get("shop", {}).get("id", ""),
-                    "shop_name": entry.get("shop", {}).get("name", ""),
-                    "price_amount": price_info.get("amount"),
-                    "price_currency": price_info.get("currency"),
-                    "regular_amount": regular_info.get("amount"),
-                    "regular_currency": regular_info.get("currency"),
-                    "cut": entry.get("deal", {}).get("cut", 0),
-                }
-            )
+        # Salva o histórico de preços em um arquivo CSV (buffer de 1 MiB para
+        # reduzir o número de chamadas de escrita em históricos grandes).
+        # O json_normalize guarda os valores em float64; "%.15g" grava 1.0
+        # como "1" e 9.99 como "9.99", igual aos valores originais da API
+        with open(filename, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            flat.to_csv(f, index=False, float_format="%.15g")
 
-        if not processed_data:
-            print("Nenhum dado processado para salvar.")
-            return
+        print(f"Histórico de preços salvo em {filename}")
 
-        # Salva o histórico de preços em um arquivo CSV
-        with open(filename, "w", newline="", encoding="utf-8") as f:
-            fieldnames = processed_data[0].keys()
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+    def save_price_history_to_parquet(self, flat, filename="price_history.parquet", country=None):
+        """Salva o histórico de preços já achatado em um arquivo Parquet (colunar)"""
+        if flat.empty:
+            print(f"Nenhum dado para salvar em {filename}")
+            return
 
-            writer.writeheader()
-            writer.writerows(processed_data)
+        # Adiciona o país ao nome do arquivo se fornecido
+        if country:
+            filename = f"price_history_{country}.parquet"
+
+        # Grava o timestamp como coluna de data (não texto) para leituras
+        # colunares; o pyarrow aplica dictionary encoding às colunas de texto
+        # repetitivas (loja, moeda), o que reduz bastante o arquivo
+        flat = flat.assign(
+            timestamp=pd.to_datetime(
+                flat["timestamp"], utc=True, format="ISO8601", errors="coerce"
+            )
+        )
+        flat.to_parquet(filename, engine="pyarrow", index=False, compression="zstd")
 
         print(f"Histórico de preços salvo em {filename}")
-        return processed_data
 
-    def run_analysis(self, start_date=None, end_date=None, shops=None, country=None):
+    def run_all(self, countries, start_date=None, end_date=None, shops=None, formats=("csv", "parquet")):
+        """Busca o histórico de vários países em paralelo e analisa cada um
+
+        Args:
+            countries (list): Lista de códigos de país (ex: ['US', 'BR'])
+            start_date (str, optional): Data de início no formato ISO (ex: 2023-01-01)
+            end_date (str, optional): Data de término no formato ISO (ex: 2023-12-31)
+            shops (list, optional): Lista de IDs de lojas para filtrar (ex: ['steam'])
+            formats (tuple, optional): Formatos de arquivo a gerar ('csv', 'parquet')
+        """
+        # Sem data final explícita o padrão é "agora", que não filtra nada:
+        # nesse caso não envia o limite para a API
+        requested_end_date = end_date
+        start_date, end_date = self._resolve_dates(start_date, end_date)
+
+        # As requisições são limitadas pela rede, então rodam em paralelo;
+        # a análise (CSV + resumo) continua sequencial para não misturar a saída
+        with ThreadPoolExecutor(max_workers=min(8, len(countries) or 1)) as executor:
+            futures = {
+                executor.submit(
+                    self.get_price_history,
+                    start_date=start_date,
+                    end_date=requested_end_date,
+                    shops=shops,
+                    country=country,
+                ): country
+                for country in countries
+            }
+
+            histories = {}
+            for future in as_completed(futures):
+                country = futures[future]
+                try:
+                    histories[country] = future.result()
+                except Exception as e:
+                    print(f"Erro ao buscar dados para {country}: {e}")
+                    histories[country] = []
+
+        for country in countries:
+            print(f"\n{'='*60}")
+            print(f"Analisando dados para: {country}")
+            print(f"{'='*60}")
+
+            self.run_analysis(
+                start_date=start_date,
+                end_date=end_date,
+                shops=shops,
+                country=country,
+                history_data=histories[country],
+                formats=formats,
+            )
+
+    def run_analysis(
+        self,
+        start_date=None,
+        end_date=None,
+        shops=None,
+        country=None,
+        history_data=None,
+        formats=("csv", "parquet"),
+    ):
         """Realiza análise do histórico de preços com filtros de intervalo de datas e lojas
 
         Args:
@@ -147,11 +259,13 @@ class GamePriceAnalyzer:
             end_date (str, optional): Data de término no formato ISO (ex: 2023-12-31)
             shops (list, optional): Lista de IDs de lojas para filtrar (ex: ['steam'])
             country (str, optional): Código do país (ex: 'US', 'BR', 'AR', 'TR', 'JP', 'DE')
+            history_data (list, optional): Histórico já buscado; se omitido, busca na API
+            formats (tuple, optional): Formatos de arquivo a gerar ('csv', 'parquet')
         """
         print("Iniciando análise do histórico de preços...")
 
-        start_date = start_date or "2012-01-01T00:00:00Z"
-        end_date = end_date or datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        requested_end_date = end_date
+        start_date, end_date = self._resolve_dates(start_date, end_date)
 
         # Mostra os filtros ativos
         print("\n=== Filtros Ativos ===")
@@ -162,16 +276,28 @@ class GamePriceAnalyzer:
         if country:
             print(f"- País: {country}")
 
-        print("\nBuscando histórico de preços...")
-        history_data = self.get_price_history(
-            start_date=start_date, end_date=end_date, shops=shops, country=country
-        )
+        if history_data is None:
+            print("\nBuscando histórico de preços...")
+            history_data = self.get_price_history(
+                start_date=start_date,
+                end_date=requested_end_date,
+                shops=shops,
+                country=country,
+            )
 
         if not history_data:
             print("\nNenhum dado encontrado com os filtros fornecidos.")
             return
 
-        prices = self.save_price_history_to_csv(history_data, country=country)
+        # Achata o histórico uma única vez e reaproveita para todos os formatos
+        flat = self._price_history_frame(history_data)
+        if "csv" in formats:
+            self.save_price_history_to_csv(flat, country=country)
+        if "parquet" in formats:
+            self.save_price_history_to_parquet(flat, country=country)
+
+        # Campos ausentes voltam a ser None (e não NaN) no resumo
+        prices = flat.astype(object).where(flat.notna(), None).to_dict("records")
         if prices:
             latest = prices[0]
             oldest = prices[-1]
@@ -194,33 +320,102 @@ class GamePriceAnalyzer:
                     change_type = "aumento" if change > 0 else "queda"
                     print(f"Variação: {abs(change):.1f}% de {change_type}")
 
-        print("\nAnálise concluída! Verifique o arquivo price_history.csv")
+        print("\nAnálise concluída! Verifique os arquivos price_history gerados")
+
+    def _price_history_frame(self, data):
+        """Achata as entradas da API em um DataFrame com as colunas exportadas"""
+        # Achata os objetos aninhados (shop.id -> shop_id, deal.price.amount -> ...)
+        # de uma vez, em vez de montar um dict por entrada
+        flat = pd.json_normalize(data, sep="_")
+        flat = flat.reindex(columns=list(self._EXPORT_COLUMNS)).rename(
+            columns=self._EXPORT_COLUMNS
+        )
+        flat["timestamp"] = flat["timestamp"].fillna("")
+        flat["cut"] = flat["cut"].fillna(0).astype(int)
+        return flat
+
+    def _to_utc_timestamp(self, value):
+        """Converte uma data ISO em pd.Timestamp no fuso UTC"""
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is None:
+            return timestamp.tz_localize("UTC")
+        return timestamp.tz_convert("UTC")
+
+    def _resolve_dates(self, start_date, end_date):
+        """Aplica o intervalo de datas padrão quando não informado"""
+        start_date = start_date or "2012-01-01T00:00:00Z"
+        end_date = end_date or datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        return start_date, end_date
+
+    def _format_amount(self, value):
+        """Exibe valores inteiros sem ".0" (1.0 -> 1), como vieram da API"""
+        if isinstance(value, float):
+            return f"{value:.15g}"
+        return value
 
     def _print_price_entry(self, entry, label="Preço"):
         """Helper para exibir informações de uma entrada de preço"""
         print(f"{label}:")
         print(f"- Data: {entry['timestamp']}")
         print(f"- Loja: {entry['shop_name']}")
-        print(f"- Valor: {entry['price_amount']} {entry['price_currency']}")
+        print(f"- Valor: {self._format_amount(entry['price_amount'])} {entry['price_currency']}")
         if entry.get("cut"):
             print(f"- Desconto: {entry['cut']}%")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Analisa o histórico de preços de um jogo na ITAD por país"
+    )
+    parser.add_argument(
+        "--countries",
+        nargs="+",
+        # USA, BRA, ARG, TUR, JPN, DEU
+        default=["US", "BR", "AR", "TR", "JP", "DE"],
+        help="Códigos de país a buscar (ex: US BR)",
+    )
+    parser.add_argument(
+        "--since", default="2005-01-01T00:00:00Z", help="Data inicial no formato ISO"
+    )
+    parser.add_argument(
+        "--until", default="2025-11-30T23:59:59Z", help="Data final no formato ISO"
+    )
+    parser.add_argument(
+        "--shops",
+        nargs="+",
+        type=int,
+        default=[61],
+        help="IDs das lojas a filtrar (padrão: 61, Steam)",
+    )
+    parser.add_argument(
+        "--format",
+        dest="formats",
+        action="append",
+        choices=["csv", "parquet"],
+        help="Formato de saída; repita a opção para gerar mais de um (padrão: csv e parquet)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Use LOG_LEVEL=DEBUG para ver os detalhes das requisições à API
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
+    try:
+        analyzer = GamePriceAnalyzer()
+        # Busca dados de todos os países em paralelo
+        analyzer.run_all(
+            args.countries,
+            start_date=args.since,
+            end_date=args.until,
+            shops=args.shops,
+            formats=tuple(args.formats or ("csv", "parquet")),
+        )
+    finally:
+        close_session()
+
+
 if __name__ == "__main__":
-    analyzer = GamePriceAnalyzer()
-
-    # Lista de países para buscar
-    countries = ["US", "BR", "AR", "TR", "JP", "DE"]  # USA, BRA, ARG, TUR, JPN, DEU
-    
-    # Busca dados para cada país
-    for country in countries:
-        print(f"\n{'='*60}")
-        print(f"Buscando dados para: {country}")
-        print(f"{'='*60}")
-        
-        analyzer.run_analysis(
-            start_date="2005-01-01T00:00:00Z",
-            end_date="2025-11-30T23:59:59Z",
-            shops=[61],  # Mantém o parâmetro mas não filtra manualmente
-            country=country
-        )
\ No newline at end of file
+    main()